@@ -2,9 +2,54 @@
 """Command-line interface for REPEAT-HD."""
 
 import argparse
+import functools
 import sys
 import struct
-import zlib
+from typing import NamedTuple, Optional, Union
+from zlib import crc32 as _zlib_crc32
+
+try:
+    # PCLMULQDQ/SIMD-accelerated CRC32, bit-compatible with zlib.crc32
+    from pycrc32 import Hasher as _Hasher, crc32 as _pycrc32  # type: ignore[import-not-found]
+except ImportError:
+    _pycrc32 = None
+
+# Below this size zlib.crc32 is faster than the pycrc32 call overhead
+_PYCRC32_MIN_LENGTH = 64
+
+
+def _crc32(data: Union[bytes, memoryview], value: int = 0) -> int:
+    """CRC32 of ``data`` continuing from ``value``, as zlib.crc32 computes it."""
+    # pycrc32 only accepts bytes; send other buffers to zlib.crc32, which
+    # reads them in place, rather than copying them
+    if _pycrc32 is None or type(data) is not bytes or len(data) < _PYCRC32_MIN_LENGTH:
+        return _zlib_crc32(data, value)
+    if not value:
+        return _pycrc32(data)
+    hasher = _Hasher.with_initial(value)
+    hasher.update(data)
+    return hasher.finalize()
+
+
+# Frame header: CRC32 (4 bytes) + length (4 bytes), little-endian
+_HEADER = struct.Struct('<II')
+
+# Chunk size used when streaming frames from a file or stdin
+_READ_CHUNK_SIZE = 64 * 1024
+
+# Payloads at least this large are viewed rather than sliced when decoding
+_PAYLOAD_VIEW_MIN_LENGTH = 16 * 1024
+
+
+class DecodeState(NamedTuple):
+    """Result of decode_data_full, including the header fields and payload CRC."""
+    decoded: str
+    is_valid: bool
+    errors: tuple[str, ...]
+    stored_crc: Optional[int]
+    stored_length: Optional[int]
+    calculated_crc: Optional[int]
+    actual_length: int
 
 
 def encode_data(data: str) -> bytes:
@@ -17,58 +62,131 @@ def encode_data(data: str) -> bytes:
     length = len(data_bytes)
     
     # Calculate CRC32 of the data
-    crc = zlib.crc32(data_bytes) & 0xffffffff
+    crc = _crc32(data_bytes)
     
     # Pack: CRC (4 bytes), length (4 bytes), then data
-    encoded = struct.pack('<II', crc, length) + data_bytes
+    encoded = _HEADER.pack(crc, length) + data_bytes
     
     return encoded
 
 
-def decode_data(encoded: bytes) -> tuple[str, bool, list[str]]:
+def read_frame(stream) -> tuple[bytes, int]:
+    """
+    Read an encoded frame from a binary stream in chunks.
+    
+    The payload CRC is updated as each chunk arrives, so checksumming is
+    interleaved with reads instead of running as a separate pass afterwards.
+    
+    Returns:
+        tuple: (encoded, payload_crc)
+            - encoded: All bytes read from the stream
+            - payload_crc: CRC32 of everything after the 8-byte header
+    """
+    chunks = []
+    crc = 0
+    header_remaining = 8
+    
+    while True:
+        chunk = stream.read(_READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        
+        # The header is not covered by the CRC
+        payload = chunk
+        if header_remaining:
+            skip = min(header_remaining, len(chunk))
+            header_remaining -= skip
+            payload = memoryview(chunk)[skip:]
+        if payload:
+            crc = _crc32(payload, crc)
+    
+    return b"".join(chunks), crc
+
+
+def decode_data(encoded: bytes, calculated_crc: Optional[int] = None) -> tuple[str, bool, list[str]]:
     """
     Decode data and verify CRC checksum.
     
+    A payload CRC already computed while reading (see read_frame) can be
+    passed as ``calculated_crc`` to skip recomputing it.
+    
     Returns:
         tuple: (decoded_string, is_valid, errors)
             - decoded_string: The decoded data (empty if invalid)
             - is_valid: True if CRC and parsing succeeded
             - errors: List of error messages
     """
-    errors = []
-    
     # Check minimum size
     if len(encoded) < 8:
-        errors.append("Data too short: minimum 8 bytes required")
-        return "", False, errors
+        return "", False, ["Data too short: minimum 8 bytes required"]
     
     try:
-        # Unpack header
-        stored_crc, length = struct.unpack('<II', encoded[:8])
-        data_bytes = encoded[8:]
+        # Unpack header; view large payloads instead of copying them
+        stored_crc, length = _HEADER.unpack_from(encoded, 0)
+        data_bytes: Union[bytes, memoryview]
+        if len(encoded) < _PAYLOAD_VIEW_MIN_LENGTH:
+            data_bytes = encoded[8:]
+        else:
+            data_bytes = memoryview(encoded)[8:]
         
         # Check if data length matches
         if len(data_bytes) != length:
-            errors.append(f"Length mismatch: expected {length}, got {len(data_bytes)}")
-            return "", False, errors
+            return "", False, [f"Length mismatch: expected {length}, got {len(data_bytes)}"]
         
         # Verify CRC
-        calculated_crc = zlib.crc32(data_bytes) & 0xffffffff
+        if calculated_crc is None:
+            calculated_crc = _crc32(data_bytes)
         if stored_crc != calculated_crc:
-            errors.append(f"CRC mismatch: expected {stored_crc:08x}, got {calculated_crc:08x}")
-            return "", False, errors
+            return "", False, [f"CRC mismatch: expected {stored_crc:08x}, got {calculated_crc:08x}"]
         
         # Decode data
-        decoded = data_bytes.decode('utf-8')
+        decoded = str(data_bytes, 'utf-8')
         
-        return decoded, True, errors
+        return decoded, True, []
         
     except struct.error as e:
-        errors.append(f"Parse error: {e}")
-        return "", False, errors
+        return "", False, [f"Parse error: {e}"]
     except UnicodeDecodeError as e:
-        errors.append(f"UTF-8 decode error: {e}")
-        return "", False, errors
+        return "", False, [f"UTF-8 decode error: {e}"]
+
+
+def decode_data_full(encoded: bytes, calculated_crc: Optional[int] = None) -> DecodeState:
+    """
+    Decode data and verify CRC checksum, keeping intermediate values.
+    
+    Returns:
+        DecodeState: Decoded data, validity, errors, header fields
+            (None if too short) and the payload CRC (None if not computed)
+    """
+    decoded, is_valid, errors = decode_data(encoded, calculated_crc)
+    actual_length = max(len(encoded) - 8, 0)
+    
+    if len(encoded) < 8:
+        return DecodeState(decoded, is_valid, tuple(errors), None, None, None, actual_length)
+    
+    stored_crc, length = _HEADER.unpack_from(encoded, 0)
+    if is_valid:
+        # A successful decode means the payload CRC matched the header
+        calculated_crc = stored_crc
+    elif length != actual_length:
+        # The CRC is not checked when the length is wrong
+        calculated_crc = None
+    elif calculated_crc is None:
+        calculated_crc = _crc32(memoryview(encoded)[8:])
+    
+    return DecodeState(decoded, is_valid, tuple(errors), stored_crc, length, calculated_crc, actual_length)
+
+
+def _check_decoded_invariants(data: str) -> list[str]:
+    """Invariant checks that look only at the decoded data."""
+    violations = []
+    
+    # Invariant 3: Data should not contain null bytes (common corruption indicator)
+    if '\x00' in data:
+        violations.append("Invariant violation: decoded data contains null bytes")
+    
+    return violations
 
 
 def check_invariants(data: str, encoded: bytes) -> list[str]:
@@ -82,33 +200,40 @@ def check_invariants(data: str, encoded: bytes) -> list[str]:
         list: Error messages for any violations found
     """
     violations = []
+    data_bytes: Union[bytes, memoryview]
+    if len(encoded) < _PAYLOAD_VIEW_MIN_LENGTH:
+        data_bytes = encoded[8:]
+    else:
+        data_bytes = memoryview(encoded)[8:]
     
-    # Invariant 1: Re-encoding should produce identical output
-    re_encoded = encode_data(data)
-    if re_encoded != encoded:
-        violations.append("Invariant violation: re-encoding produces different output")
-    
-    # Invariant 2: Length field should match actual data length
-    if len(encoded) >= 8:
-        _, stored_length = struct.unpack('<II', encoded[:8])
-        actual_data_length = len(encoded) - 8
-        if stored_length != actual_data_length:
+    if len(encoded) < 8:
+        violations.append("Invariant violation: encoded data shorter than 8-byte header")
+    else:
+        stored_crc, stored_length = _HEADER.unpack_from(encoded, 0)
+        
+        # Invariant 1: Stored CRC should match the CRC of the stored payload
+        if stored_crc != _crc32(data_bytes):
+            violations.append("Invariant violation: stored CRC does not match payload")
+        
+        # Invariant 2: Length field should match actual data length
+        if stored_length != len(data_bytes):
             violations.append(
                 f"Invariant violation: stored length ({stored_length}) != "
-                f"actual data length ({actual_data_length})"
+                f"actual data length ({len(data_bytes)})"
             )
     
-    # Invariant 3: Data should not contain null bytes (common corruption indicator)
-    if '\x00' in data:
-        violations.append("Invariant violation: decoded data contains null bytes")
+    violations.extend(_check_decoded_invariants(data))
     
-    # Invariant 4: Encoded size should be reasonable (header + data)
-    expected_size = 8 + len(data.encode('utf-8'))
+    # Invariant 4: Data should encode to exactly the stored payload
+    expected = data.encode('utf-8')
+    expected_size = 8 + len(expected)
     if len(encoded) != expected_size:
         violations.append(
             f"Invariant violation: encoded size ({len(encoded)}) != "
             f"expected size ({expected_size})"
         )
+    elif not encoded.endswith(expected):
+        violations.append("Invariant violation: decoded data does not match payload")
     
     return violations
 
@@ -123,17 +248,22 @@ def cmd_encode(args):
     return 0
 
 
-def cmd_verify(args):
-    """Handle the verify command."""
-    # Read input
+def cmd_verify(args, *, stdin=None):
+    """
+    Handle the verify command.
+    
+    ``stdin`` is the binary stream read when no --infile is given; it
+    defaults to ``sys.stdin.buffer``.
+    """
+    # Read input, computing the payload CRC as chunks arrive
     if args.infile:
         with open(args.infile, 'rb') as f:
-            encoded = f.read()
+            encoded, crc = read_frame(f)
     else:
-        encoded = sys.stdin.buffer.read()
+        encoded, crc = read_frame(stdin if stdin is not None else sys.stdin.buffer)
     
     # Decode and verify CRC/parse
-    decoded, is_valid, errors = decode_data(encoded)
+    decoded, is_valid, errors = decode_data(encoded, crc)
     
     if not is_valid:
         print("VERIFICATION FAILED", file=sys.stderr)
@@ -141,9 +271,11 @@ def cmd_verify(args):
             print(f"  - {error}", file=sys.stderr)
         return 1
     
-    # If --strict flag is enabled, perform additional invariant checks
+    # If --strict flag is enabled, perform additional invariant checks.
+    # A successful decode has already matched the header against the
+    # payload and decoded the data from it, so only data checks remain.
     if args.strict:
-        violations = check_invariants(decoded, encoded)
+        violations = _check_decoded_invariants(decoded)
         if violations:
             print("STRICT MODE VIOLATIONS DETECTED", file=sys.stderr)
             for violation in violations:
@@ -161,8 +293,9 @@ def cmd_verify(args):
     return 0
 
 
-def main():
-    """Main CLI entry point."""
+@functools.lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser once and reuse it across main() calls."""
     parser = argparse.ArgumentParser(
         prog='repeat_hd',
         description='REPEAT-HD: Data encoding and verification tool'
@@ -198,8 +331,15 @@ def main():
     )
     verify_parser.set_defaults(func=cmd_verify)
     
+    return parser
+
+
+def main(argv=None):
+    """Main CLI entry point."""
+    parser = _build_parser()
+    
     # Parse arguments
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     if not args.command:
         parser.print_help()
@@ -3,16 +3,66 @@
 import pytest
 import tempfile
 import os
+import io
+import struct
+import subprocess
+import sys
+import zlib
 from repeat_hd.cli import (
     encode_data,
     decode_data,
+    decode_data_full,
+    read_frame,
     check_invariants,
     cmd_encode,
     cmd_verify,
+    main,
+    _build_parser,
+    _crc32,
 )
 import argparse
 
 
+# Command prefix for the single subprocess smoke test, run from the repo
+# root so the child process can import repeat_hd
+_CLI_ARGV = (sys.executable, '-m', 'repeat_hd')
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Payloads that must survive an encode/decode/invariant roundtrip
+VALID_PAYLOADS = (
+    pytest.param("hello world", id="ascii"),
+    pytest.param("", id="empty"),
+    pytest.param("Hello 世界 🌍", id="unicode"),
+)
+
+# Frames reused across tests, encoded once at import
+FRAMES = {s: encode_data(s) for s in ("hello", "test data", "hello\x00world")}
+
+# Frames with the CRC field overwritten, built once at import
+_BAD_CRC = b'\xff\xff\xff\xff'
+_HELLO_BAD_CRC = _BAD_CRC + FRAMES["hello"][4:]
+_TEST_DATA_BAD_CRC = _BAD_CRC + FRAMES["test data"][4:]
+
+# (frame, expected error substring) pairs that decode_data must reject
+FAIL_VECTORS = (
+    pytest.param(b"short", "too short", id="too-short"),
+    pytest.param(_HELLO_BAD_CRC, "crc mismatch", id="corrupted-crc"),
+    pytest.param(FRAMES["hello"] + b"extra", "length mismatch", id="length-mismatch"),
+)
+
+# (frame, strict, expected exit code) for cmd_verify
+VERIFY_CASES = (
+    pytest.param(FRAMES["test data"], False, 0, id="valid"),
+    pytest.param(FRAMES["test data"], True, 0, id="valid-strict"),
+    pytest.param(_TEST_DATA_BAD_CRC, False, 1, id="bad-crc"),
+    # Should fail at CRC check before getting to invariants
+    pytest.param(_TEST_DATA_BAD_CRC, True, 1, id="bad-crc-strict"),
+    # Null bytes pass CRC but violate an invariant under --strict only
+    pytest.param(FRAMES["hello\x00world"], True, 2, id="invariant-violation-strict"),
+    pytest.param(FRAMES["hello\x00world"], False, 0, id="invariants-skipped"),
+)
+
+
 class TestEncodeData:
     """Tests for encode_data function."""
     
@@ -33,34 +83,37 @@ class TestEncodeData:
         assert len(result) > 8
         # UTF-8 encoded "世界" takes 6 bytes
         assert len(result) == 8 + len("Hello 世界".encode('utf-8'))
+    
+    def test_encode_crc_matches_zlib(self):
+        """Test the CRC32 backend is bit-compatible with zlib.crc32."""
+        data = "hello" * 100
+        result = encode_data(data)
+        stored_crc, _ = struct.unpack('<II', result[:8])
+        assert stored_crc == zlib.crc32(data.encode('utf-8'))
+    
+    @pytest.mark.parametrize("size", [0, 16, 63, 64, 4096])
+    def test_crc32_wrapper_matches_zlib(self, size):
+        """Test _crc32 handles bytes, buffers and running CRC values."""
+        payload = ("hello 世界".encode('utf-8') * 1000)[:size]
+        running = zlib.crc32(b"header")
+        
+        assert _crc32(payload) == zlib.crc32(payload)
+        assert _crc32(payload, running) == zlib.crc32(payload, running)
+        assert _crc32(memoryview(payload), running) == zlib.crc32(payload, running)
+    
+    def test_crc32_uses_pycrc32_when_installed(self):
+        """Test the pycrc32 backend is loaded when it is available."""
+        pytest.importorskip("pycrc32")
+        from repeat_hd import cli
+        assert cli._pycrc32 is not None
 
 
 class TestDecodeData:
     """Tests for decode_data function."""
     
-    def test_decode_valid_data(self):
+    @pytest.mark.parametrize("original", VALID_PAYLOADS)
+    def test_decode_valid_data(self, original):
         """Test decoding valid encoded data."""
-        original = "hello world"
-        encoded = encode_data(original)
-        decoded, is_valid, errors = decode_data(encoded)
-        
-        assert is_valid
-        assert decoded == original
-        assert len(errors) == 0
-    
-    def test_decode_empty_data(self):
-        """Test decoding empty encoded data."""
-        original = ""
-        encoded = encode_data(original)
-        decoded, is_valid, errors = decode_data(encoded)
-        
-        assert is_valid
-        assert decoded == original
-        assert len(errors) == 0
-    
-    def test_decode_unicode(self):
-        """Test decoding unicode data."""
-        original = "Hello 世界 🌍"
         encoded = encode_data(original)
         decoded, is_valid, errors = decode_data(encoded)
         
@@ -68,64 +121,88 @@ class TestDecodeData:
         assert decoded == original
         assert len(errors) == 0
     
-    def test_decode_too_short(self):
-        """Test decoding data that's too short."""
-        decoded, is_valid, errors = decode_data(b"short")
+    @pytest.mark.parametrize("frame,needle", FAIL_VECTORS)
+    def test_decode_invalid_data(self, frame, needle):
+        """Test decoding short, corrupted or mis-sized frames."""
+        decoded, is_valid, errors = decode_data(frame)
         
         assert not is_valid
         assert decoded == ""
         assert len(errors) > 0
-        assert "too short" in errors[0].lower()
+        assert needle in errors[0].lower()
     
-    def test_decode_corrupted_crc(self):
-        """Test decoding data with corrupted CRC."""
-        encoded = encode_data("hello")
-        # Corrupt the CRC (first 4 bytes)
-        corrupted = b'\xff\xff\xff\xff' + encoded[4:]
-        
-        decoded, is_valid, errors = decode_data(corrupted)
+    @pytest.mark.parametrize("size", [16 * 1024 - 9, 16 * 1024, 64 * 1024])
+    def test_decode_around_view_threshold(self, size):
+        """Test sliced and viewed payloads decode and fail the same way."""
+        encoded = encode_data("a" * size)
+        assert decode_data(encoded) == ("a" * size, True, [])
         
+        decoded, is_valid, errors = decode_data(encoded[:-1] + b"b")
         assert not is_valid
-        assert decoded == ""
-        assert len(errors) > 0
         assert "crc mismatch" in errors[0].lower()
+
+
+class TestDecodeDataFull:
+    """Tests for decode_data_full function."""
     
-    def test_decode_length_mismatch(self):
-        """Test decoding data with length mismatch."""
-        encoded = encode_data("hello")
-        # Add extra bytes
-        corrupted = encoded + b"extra"
+    def test_full_valid_data(self):
+        """Test the decode state carries header fields and CRC."""
+        encoded = FRAMES["hello"]
+        state = decode_data_full(encoded)
+        
+        assert state.is_valid
+        assert state.decoded == "hello"
+        assert state.errors == ()
+        assert state.stored_crc == state.calculated_crc
+        assert state.stored_length == state.actual_length == 5
+    
+    def test_full_length_mismatch_skips_crc(self):
+        """Test the CRC is not computed when the length check fails."""
+        encoded = FRAMES["hello"]
+        state = decode_data_full(encoded + b"extra")
         
-        decoded, is_valid, errors = decode_data(corrupted)
+        assert not state.is_valid
+        assert isinstance(state.errors, tuple)
+        assert state.calculated_crc is None
+        assert state.actual_length == 10
+    
+    def test_precomputed_crc_is_verified(self):
+        """Test decode_data_full checks a precomputed CRC against the header."""
+        encoded = FRAMES["hello"]
+        state = decode_data_full(encoded, calculated_crc=0)
         
-        assert not is_valid
-        assert decoded == ""
-        assert len(errors) > 0
-        assert "length mismatch" in errors[0].lower()
+        assert not state.is_valid
+        assert "crc mismatch" in state.errors[0].lower()
 
 
-class TestCheckInvariants:
-    """Tests for check_invariants function."""
+class TestReadFrame:
+    """Tests for read_frame function."""
     
-    def test_invariants_valid_data(self):
-        """Test invariants pass for valid data."""
-        data = "hello world"
-        encoded = encode_data(data)
-        violations = check_invariants(data, encoded)
+    @pytest.mark.parametrize("chunk_size", [1, 3, 8, 11, 65536])
+    def test_read_frame_chunked_crc(self, monkeypatch, chunk_size):
+        """Test the streamed CRC matches the payload CRC for any chunking."""
+        monkeypatch.setattr('repeat_hd.cli._READ_CHUNK_SIZE', chunk_size)
+        encoded = encode_data("streamed payload 世界")
         
-        assert len(violations) == 0
+        data, crc = read_frame(io.BytesIO(encoded))
+        
+        assert data == encoded
+        assert crc == zlib.crc32(encoded[8:])
     
-    def test_invariants_empty_data(self):
-        """Test invariants pass for empty data."""
-        data = ""
-        encoded = encode_data(data)
-        violations = check_invariants(data, encoded)
+    def test_read_frame_short_input(self):
+        """Test reading input shorter than the header."""
+        data, crc = read_frame(io.BytesIO(b"short"))
         
-        assert len(violations) == 0
+        assert data == b"short"
+        assert crc == 0
+
+
+class TestCheckInvariants:
+    """Tests for check_invariants function."""
     
-    def test_invariants_unicode_data(self):
-        """Test invariants pass for unicode data."""
-        data = "Hello 世界 🌍"
+    @pytest.mark.parametrize("data", VALID_PAYLOADS)
+    def test_invariants_valid_data(self, data):
+        """Test invariants pass for valid data."""
         encoded = encode_data(data)
         violations = check_invariants(data, encoded)
         
@@ -142,8 +219,7 @@ class TestCheckInvariants:
     
     def test_invariants_detect_wrong_size(self):
         """Test invariants detect wrong encoded size."""
-        data = "hello"
-        encoded = encode_data(data)
+        data, encoded = "hello", FRAMES["hello"]
         # Corrupt by adding extra bytes
         corrupted = encoded + b"extra"
         violations = check_invariants(data, corrupted)
@@ -151,124 +227,77 @@ class TestCheckInvariants:
         assert len(violations) > 0
         assert any("encoded size" in v.lower() for v in violations)
     
-    def test_invariants_detect_re_encoding_mismatch(self):
-        """Test invariants detect re-encoding mismatch."""
-        data = "hello"
-        encoded = encode_data(data)
-        # Create a different encoding by modifying it
+    def test_invariants_detect_corrupted_payload(self):
+        """Test invariants detect a payload that no longer matches its CRC."""
+        data, encoded = "hello", FRAMES["hello"]
+        # Corrupt the last payload byte
         corrupted = encoded[:-1] + b'X'
         violations = check_invariants(data, corrupted)
         
-        # Should detect multiple issues including re-encoding mismatch
+        # Should detect multiple issues including the CRC mismatch
         assert len(violations) > 0
-
-
-class TestCmdVerify:
-    """Tests for cmd_verify function with --strict flag."""
+        assert any("crc" in v.lower() for v in violations)
     
-    def test_verify_without_strict_valid_data(self):
-        """Test verify command without --strict flag on valid data."""
-        # Create a temporary file with encoded data
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as f:
-            encoded = encode_data("test data")
-            f.write(encoded)
-            temp_file = f.name
+    def test_invariants_detect_data_mismatch(self):
+        """Test invariants detect data that differs from a valid frame's payload."""
+        violations = check_invariants("hello", encode_data("world"))
         
-        try:
-            args = argparse.Namespace(infile=temp_file, strict=False)
-            result = cmd_verify(args)
-            assert result == 0
-        finally:
-            os.unlink(temp_file)
+        assert violations == ["Invariant violation: decoded data does not match payload"]
     
-    def test_verify_with_strict_valid_data(self):
-        """Test verify command with --strict flag on valid data."""
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as f:
-            encoded = encode_data("test data")
-            f.write(encoded)
-            temp_file = f.name
+    def test_invariants_detect_trailing_garbage(self):
+        """Test invariants detect bytes appended to a valid frame."""
+        violations = check_invariants("hello", FRAMES["hello"] + b"garbage")
         
-        try:
-            args = argparse.Namespace(infile=temp_file, strict=True)
-            result = cmd_verify(args)
-            assert result == 0
-        finally:
-            os.unlink(temp_file)
+        assert any("crc" in v.lower() for v in violations)
+        assert any("stored length" in v.lower() for v in violations)
     
-    def test_verify_without_strict_invalid_crc(self):
-        """Test verify command without --strict flag on invalid CRC."""
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as f:
-            encoded = encode_data("test data")
-            # Corrupt CRC
-            corrupted = b'\xff\xff\xff\xff' + encoded[4:]
-            f.write(corrupted)
-            temp_file = f.name
+    def test_invariants_detect_zeroed_header(self):
+        """Test invariants detect a zeroed header in front of the payload."""
+        violations = check_invariants("hello", b"\x00" * 8 + b"hello")
         
-        try:
-            args = argparse.Namespace(infile=temp_file, strict=False)
-            result = cmd_verify(args)
-            assert result == 1  # CRC failure
-        finally:
-            os.unlink(temp_file)
+        assert any("crc" in v.lower() for v in violations)
+        assert any("stored length" in v.lower() for v in violations)
     
-    def test_verify_with_strict_invalid_crc(self):
-        """Test verify command with --strict flag on invalid CRC."""
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as f:
-            encoded = encode_data("test data")
-            # Corrupt CRC
-            corrupted = b'\xff\xff\xff\xff' + encoded[4:]
-            f.write(corrupted)
-            temp_file = f.name
+    def test_invariants_detect_truncated_header(self):
+        """Test invariants detect encoded data shorter than the header."""
+        violations = check_invariants("", b"short")
         
-        try:
-            args = argparse.Namespace(infile=temp_file, strict=True)
-            result = cmd_verify(args)
-            # Should fail at CRC check before getting to invariants
-            assert result == 1
-        finally:
-            os.unlink(temp_file)
+        assert len(violations) > 0
+        assert any("header" in v.lower() for v in violations)
+
+
+class TestCmdVerify:
+    """Tests for cmd_verify function with --strict flag."""
     
-    def test_verify_with_strict_invariant_violation(self):
-        """Test verify command with --strict flag detecting invariant violation."""
+    @pytest.mark.parametrize("encoded,strict,expected", VERIFY_CASES)
+    def test_verify_exit_code(self, encoded, strict, expected):
+        """Test verify exit codes with and without --strict."""
         with tempfile.NamedTemporaryFile(mode='wb', delete=False) as f:
-            # Create data with null bytes (violates invariant)
-            encoded = encode_data("hello\x00world")
             f.write(encoded)
             temp_file = f.name
         
         try:
-            args = argparse.Namespace(infile=temp_file, strict=True)
-            result = cmd_verify(args)
-            # Should return 2 for invariant violation
-            assert result == 2
+            args = argparse.Namespace(infile=temp_file, strict=strict)
+            assert cmd_verify(args) == expected
         finally:
             os.unlink(temp_file)
     
-    def test_verify_without_strict_skips_invariants(self):
-        """Test verify without --strict doesn't check invariants."""
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as f:
-            # Create data with null bytes (violates invariant but passes CRC)
-            encoded = encode_data("hello\x00world")
-            f.write(encoded)
-            temp_file = f.name
-        
-        try:
-            args = argparse.Namespace(infile=temp_file, strict=False)
-            result = cmd_verify(args)
-            # Should pass because CRC is valid and invariants are not checked
-            assert result == 0
-        finally:
-            os.unlink(temp_file)
+    @pytest.mark.parametrize("encoded,strict,expected", VERIFY_CASES)
+    def test_verify_stdin_input(self, encoded, strict, expected):
+        """Test verify reads from an injected stdin stream."""
+        args = argparse.Namespace(infile=None, strict=strict)
+        assert cmd_verify(args, stdin=io.BytesIO(encoded)) == expected
 
 
 class TestCmdEncode:
     """Tests for cmd_encode function."""
     
-    def test_encode_simple_data(self):
-        """Test encoding simple data via the encode function."""
-        # Test encode_data function directly (cmd_encode is hard to test due to stdout)
+    def test_encode_simple_data(self, capsysbinary):
+        """Test cmd_encode writes a decodable frame to stdout."""
         data = "test"
-        encoded = encode_data(data)
+        args = argparse.Namespace(data=data)
+        assert cmd_encode(args) == 0
+        encoded = capsysbinary.readouterr().out
         
         # Verify the encoded data can be decoded
         decoded, is_valid, errors = decode_data(encoded)
@@ -277,12 +306,63 @@ class TestCmdEncode:
         assert len(errors) == 0
 
 
+class TestMain:
+    """Tests for the main entry point."""
+    
+    def test_parser_is_built_once(self):
+        """Test repeated calls reuse the same parser instance."""
+        assert _build_parser() is _build_parser()
+    
+    def test_main_verify_with_argv(self):
+        """Test main() runs in-process with an explicit argv."""
+        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as f:
+            f.write(FRAMES["test data"])
+            temp_file = f.name
+        
+        try:
+            assert main(['verify', '--strict', '--infile', temp_file]) == 0
+            assert main(['verify', '--infile', temp_file]) == 0
+        finally:
+            os.unlink(temp_file)
+    
+    def test_main_without_command(self):
+        """Test main() without a command prints help and fails."""
+        assert main([]) == 1
+    
+    def test_main_encode_writes_frame(self, capsysbinary):
+        """Test main() encode writes the binary frame to stdout."""
+        assert main(['encode', 'test data']) == 0
+        assert capsysbinary.readouterr().out == FRAMES["test data"]
+    
+    def test_cli_smoke_subprocess(self):
+        """Test the python -m entry point end to end (the one subprocess test)."""
+        encoded = subprocess.run(
+            [*_CLI_ARGV, 'encode', 'test data'],
+            capture_output=True, check=False, cwd=_REPO_ROOT,
+        )
+        assert encoded.returncode == 0
+        assert encoded.stdout == FRAMES["test data"]
+        
+        verified = subprocess.run(
+            [*_CLI_ARGV, 'verify', '--strict'],
+            input=encoded.stdout, capture_output=True, check=False, cwd=_REPO_ROOT,
+        )
+        assert verified.returncode == 0
+        assert b"VERIFICATION PASSED" in verified.stderr
+
+
 class TestIntegration:
     """Integration tests for the full encode/verify workflow."""
     
-    def test_encode_verify_roundtrip(self):
+    @pytest.mark.parametrize("original", [
+        "Integration test data 🚀",
+        "Short",
+        "",
+        "Unicode: 世界 🌍",
+        "Numbers: 1234567890",
+    ])
+    def test_encode_verify_roundtrip(self, original):
         """Test full encode -> verify roundtrip."""
-        original = "Integration test data 🚀"
         encoded = encode_data(original)
         decoded, is_valid, errors = decode_data(encoded)
         